@@ -3,26 +3,125 @@
 # expense_manager.py
 # A desktop personal finance (记账本) app implemented in Python with Tkinter.
 # Implements classes: User, Record, LoanRecord, Statistics, ReminderService, UIController
-# Persistence: local JSON file (data.json)
+# Persistence: local JSON file (data.json) + append-only op log (data.log)
 # Author: generated with ChatGPT assistance
 # License: MIT
 import json
 import threading
+import queue
+import bisect
+import functools
+from array import array
+from itertools import compress
 import uuid
 import datetime
+import math
 import os
-from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict, Any, Tuple
+import mmap
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Tuple, Callable
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 
+try:
+    import orjson  # optional: much faster JSON encode/decode
+except ImportError:
+    orjson = None
+
 # ----------------------------- Data Models ----------------------------------
 
+#序列化为 UTF-8 编码的 JSON 字节；优先使用 orjson，未安装时退回标准库 json。
+#两种实现都拒绝 inf/nan（ValueError），否则 orjson 会把它们写成 null，下次加载时出错
+def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        # orjson writes non-finite floats as null, so only output containing null needs a look
+        if b'null' in data:
+            _check_finite(obj)
+        return data
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, allow_nan=False).encode('utf-8')
+
+def _check_finite(obj: Any):
+    if type(obj) is float:
+        if not math.isfinite(obj):
+            raise ValueError(f"Out of range float values are not JSON compliant: {obj!r}")
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            _check_finite(v)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            _check_finite(v)
+
+#从 JSON 字节反序列化
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+_MMAP_READ_MIN = 1 << 20  # files at least this large are parsed straight from a memory map
+
+#读取并解析 JSON 文件；装了 orjson 且文件较大时直接解析内存映射，省去整份读入 bytes 的复制
+def _read_json(path: str) -> Any:
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if orjson is None or size < _MMAP_READ_MIN:
+            return _json_loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # orjson takes a memoryview but not the mmap itself; release it before the map closes
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+#原子写文件：先写同目录下的临时文件再 os.replace，中途崩溃不会留下写了一半的目标文件；
+#fsync=True 时同时 fsync 文件和所在目录，保证改名本身也已落盘
+def _write_atomic(path: str, data: bytes, fsync: bool = False):
+    tmp = path + '.tmp'
+    try:
+        # payload larger than the buffer is passed straight to write(), normally one syscall
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    if fsync and hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
 #生成当前时间的 ISO 格式字符串
 def now_iso() -> str:
     return datetime.datetime.now().isoformat(timespec='seconds')
 
-@dataclass
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+#把 ISO 时间字符串转换为整数秒（本地挂钟时间，不受时区/夏令时影响），用于快速比较；无法解析时返回 0
+def iso_to_epoch(ts: str) -> int:
+    try:
+        dt = datetime.datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return 0
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return (dt - _EPOCH) // datetime.timedelta(seconds=1)
+
+#把 ISO 时间字符串编码为月份序号 year*12 + month-1；无法解析时返回 -1
+def _month_code(ts: str) -> int:
+    try:
+        # slicing the ISO string is much cheaper than fromisoformat
+        return int(ts[0:4]) * 12 + int(ts[5:7]) - 1
+    except ValueError:
+        return -1
+
+
+@dataclass(slots=True)
 class Record:
     #表示单条收支记录的数据结构
     """A single income/expense record."""
@@ -33,18 +132,47 @@ class Record:
     timestamp: str  # ISO string
     note: str = ''
     overconsumption_mark: bool = False
+    # derived from timestamp/amount, not persisted
+    ts_epoch: int = field(init=False, default=0, repr=False, compare=False)
+    amount_text: str = field(init=False, default='', repr=False, compare=False)  # '{:.2f}' for the list view
+    month_code: int = field(init=False, default=-1, repr=False, compare=False)  # see _month_code
+
+    def __post_init__(self):
+        self._sync_derived()
+
+    #重新计算由其他字段派生的缓存字段（字段被修改后调用）
+    def _sync_derived(self):
+        self.ts_epoch = iso_to_epoch(self.timestamp)
+        self.month_code = _month_code(self.timestamp)
+        self.amount_text = f'{self.amount:.2f}'
 
-    #将 Record 对象转换为字典，用于 JSON 序列化
+    #将 Record 对象转换为字典，用于 JSON 序列化（字段都是标量，不需要 asdict 的递归深拷贝）
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {'id': self.id, 'amount': self.amount, 'kind': self.kind, 'category': self.category,
+                'timestamp': self.timestamp, 'note': self.note, 'overconsumption_mark': self.overconsumption_mark}
 
     #从字典创建 Record 对象，用于 JSON 反序列化
     @staticmethod
     def from_dict(d: Dict[str, Any]) -> 'Record':
-        return Record(**d)
+        return Record(d['id'], d['amount'], d['kind'], d['category'], d['timestamp'],
+                      d.get('note', ''), d.get('overconsumption_mark', False))
 
-
-@dataclass
+    #批量加载用：跳过 dataclass 生成的 __init__ 直接给槽位赋值，派生字段照常由 _sync_derived 计算
+    @staticmethod
+    def from_dict_fast(d: Dict[str, Any]) -> 'Record':
+        r = object.__new__(Record)
+        r.id = d['id']
+        r.amount = d['amount']
+        r.kind = d['kind']
+        r.category = d['category']
+        r.timestamp = d['timestamp']
+        r.note = d.get('note', '')
+        r.overconsumption_mark = d.get('overconsumption_mark', False)
+        r._sync_derived()
+        return r
+
+
+@dataclass(slots=True)
 class LoanRecord:
     #表示借款记录的数据结构
     """A loan/IOU record."""
@@ -55,22 +183,76 @@ class LoanRecord:
     due_date: Optional[str] = None
     repaid: bool = False
     note: str = ''
+    # derived from due_date/amount, not persisted
+    due_date_obj: Optional[datetime.date] = field(init=False, default=None, repr=False, compare=False)
+    amount_text: str = field(init=False, default='', repr=False, compare=False)  # '{:.2f}' for the loan view
+
+    def __post_init__(self):
+        self._sync_derived()
+
+    def _sync_derived(self):
+        self.amount_text = f'{self.amount:.2f}'
+        try:
+            self.due_date_obj = datetime.datetime.fromisoformat(self.due_date).date() if self.due_date else None
+        except (TypeError, ValueError):
+            self.due_date_obj = None
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {'id': self.id, 'name': self.name, 'amount': self.amount, 'loan_date': self.loan_date,
+                'due_date': self.due_date, 'repaid': self.repaid, 'note': self.note}
 
     @staticmethod
     def from_dict(d: Dict[str, Any]) -> 'LoanRecord':
-        return LoanRecord(**d)
+        return LoanRecord(d['id'], d['name'], d['amount'], d['loan_date'],
+                          d.get('due_date'), d.get('repaid', False), d.get('note', ''))
+
+
+@dataclass
+class _RecordColumns:
+    #记录的列式(SoA)视图，按时间升序排列，供统计做批量聚合
+    ts_epoch: array  # 'q', see iso_to_epoch
+    amounts: array  # 'd'
+    is_income: array  # 'b', 1 for income
+    is_expense: array  # 'b', complement of is_income
+    cat_codes: array  # 'i', index into User._cat_names
+
+
+#截至 today 所在月的最近 months 个月：返回 (首月序号, 月份标签)；
+#调用方只用少数几个 months 值，月份换算只在每天第一次调用时做
+@functools.lru_cache(maxsize=8)
+def _month_window(months: int, today: datetime.date) -> Tuple[int, Tuple[str, ...]]:
+    last = today.year * 12 + today.month - 1
+    first = last - months + 1
+    return first, tuple(f'{c // 12:04d}-{c % 12 + 1:02d}' for c in range(first, last + 1))
 
 
 # ----------------------------- Business Logic --------------------------------
 
 class Storage:
-    """Simple JSON file storage for records and settings."""
+    """Simple JSON file storage for records and settings.
+
+    Single mutations are appended to a JSONL operation log next to the data
+    file instead of rewriting it; the log is merged back into the JSON file
+    by `compact()` on close, and by a background writer thread every
+    COMPACT_EVERY ops so the full rewrite never runs on the UI thread.
+    """
+    COMPACT_EVERY = 200
+    DIRTY_FLUSH_DELAY = 0.25  # seconds; settings/overcat changes within this window coalesce
+    # whole-section values that are written lazily through mark_dirty()
+    _DIRTY_OPS = {'settings': 'update_settings', 'overconsumption_categories': 'set_overconsumption_categories'}
+
     #初始化存储对象，设置数据文件路径和默认数据结构
     def __init__(self, path: str = 'data.json'):
         self.path = path
+        self.log_path = os.path.splitext(path)[0] + '.log'
+        self._log = None  # cached append-mode handle of the op log
+        self._index: Dict[str, Tuple[list, Dict[str, Dict[str, Any]]]] = {}
+        self._ops_since_compact = 0
+        self._lock = threading.RLock()  # guards _data and the files against the writer thread
+        self._save_queue: queue.Queue = queue.Queue(maxsize=1)
+        self._writer: Optional[threading.Thread] = None
+        self._dirty: Dict[str, Any] = {}
+        self._dirty_timer: Optional[threading.Timer] = None
         self._data = {
             'records': [],
             'loans': [],
@@ -85,65 +267,385 @@ class Storage:
         }
         self._load()
 
-    #从 JSON 文件加载数据，如果文件不存在则使用默认数据
+    #从 JSON 文件加载数据，如果文件不存在则使用默认数据；随后重放操作日志
     def _load(self):
         if os.path.exists(self.path):
             try:
-                with open(self.path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self._data.update(data)
+                data = _read_json(self.path)
+                self._data.update(data)
             except Exception as e:
                 print("Failed to load storage:", e)
+        self._replay_log()
 
-    #将当前数据保存到 JSON 文件
-    def save(self):
+    #按顺序重放上次合并之后记录的操作；跳过损坏的行，并在重放后修复日志，
+    #否则下次追加会接在半行后面，把新操作也写坏
+    def _replay_log(self):
+        if not os.path.exists(self.log_path):
+            return
+        damaged = False
+        clean_end = 0  # offset just past the last newline-terminated line
         try:
-            with open(self.path, 'w', encoding='utf-8') as f:
-                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    if line.endswith(b'\n'):
+                        clean_end += len(line)
+                    else:
+                        damaged = True  # torn tail from a crash mid-append
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = _json_loads(line)
+                        self._apply_op(entry['op'], entry['data'])
+                    except (ValueError, KeyError, TypeError) as e:
+                        print("Skipping bad storage log line:", e)
+                        damaged = True
+                        continue
+                    self._ops_since_compact += 1
         except Exception as e:
-            print("Failed to save storage:", e)
+            print("Failed to replay storage log:", e)
+            return
+        if damaged:
+            # merge what was recovered into the data file, which also drops the log
+            self.save(durable=True)
+            if os.path.exists(self.log_path):
+                # save failed: at least cut the torn tail so new ops start on a fresh line
+                with open(self.log_path, 'r+b') as f:
+                    f.truncate(clean_end)
+
+    #将单个操作应用到内存数据上（写入日志和重放日志共用）
+    def _apply_op(self, op: str, payload: Any):
+        if op in ('add_record', 'update_record'):
+            self._upsert('records', payload)
+        elif op == 'delete_record':
+            self._remove('records', payload['id'])
+        elif op in ('add_loan', 'update_loan'):
+            self._upsert('loans', payload)
+        elif op == 'delete_loan':
+            self._remove('loans', payload['id'])
+        elif op == 'update_settings':
+            self._data['settings'].update(payload)
+        elif op == 'set_overconsumption_categories':
+            self._data['overconsumption_categories'] = list(payload)
+        else:
+            raise ValueError(f"unknown storage op: {op}")
+
+    #返回 id -> 原始字典 的索引；对应列表被整体替换时重建
+    def _id_index(self, key: str) -> Dict[str, Dict[str, Any]]:
+        items = self._data[key]
+        cached = self._index.get(key)
+        if cached is None or cached[0] is not items:
+            cached = (items, {d.get('id'): d for d in items})
+            self._index[key] = cached
+        return cached[1]
+
+    #原地更新已有字典，或追加新字典，无需重新序列化整个列表
+    def _upsert(self, key: str, item: Dict[str, Any]):
+        index = self._id_index(key)
+        existing = index.get(item['id'])
+        if existing is not None:
+            existing.update(item)
+        else:
+            self._data[key].append(item)
+            index[item['id']] = item
+
+    def _remove(self, key: str, item_id: str):
+        existing = self._id_index(key).pop(item_id, None)
+        if existing is not None:
+            self._data[key].remove(existing)
+
+    #追加一条操作到日志（一行 JSON），不重写整个数据文件
+    def append_op(self, op: str, payload: Any):
+        # encode first: a payload that cannot be stored (e.g. inf/nan) raises before touching the data
+        line = _json_dumps({'op': op, 'data': payload}) + b'\n'
+        with self._lock:
+            self._apply_op(op, payload)
+            try:
+                if self._log is None:
+                    self._log = open(self.log_path, 'ab')
+                self._log.write(line)
+                self._log.flush()
+            except Exception as e:
+                print("Failed to append storage log:", e)
+            self._ops_since_compact += 1
+            if self._ops_since_compact >= self.COMPACT_EVERY:
+                self.schedule_save()
+
+    #标记某个配置段(settings/overconsumption_categories)已修改，延迟写入；
+    #value 传当前的对象本身，写入时才复制，窗口内的多次修改只写一次
+    def mark_dirty(self, section: str, value: Any):
+        with self._lock:
+            self._dirty[section] = value
+            if self._dirty_timer is None:
+                self._dirty_timer = threading.Timer(self.DIRTY_FLUSH_DELAY, self.flush_dirty)
+                self._dirty_timer.daemon = True
+                self._dirty_timer.start()
+
+    #把待写入的配置段追加到操作日志
+    def flush_dirty(self):
+        with self._lock:
+            if self._dirty_timer is not None:
+                self._dirty_timer.cancel()
+                self._dirty_timer = None
+            dirty, self._dirty = self._dirty, {}
+            for section, value in dirty.items():
+                payload = dict(value) if isinstance(value, dict) else list(value)
+                self.append_op(self._DIRTY_OPS[section], payload)
+
+    #将当前数据完整保存到 JSON 文件（原子替换），并清空已合并的操作日志；
+    #durable=True 时在替换前 fsync，只在退出等需要落盘保证的场合使用
+    def save(self, durable: bool = False):
+        with self._lock:
+            try:
+                # compact: the data file is not meant to be read by hand
+                _write_atomic(self.path, _json_dumps(self._data), fsync=durable)
+                # a log that could not be removed is harmless: replaying it onto the saved data is idempotent
+                self._reset_log()
+            except Exception as e:
+                print("Failed to save storage:", e)
+
+    #请求后台线程做一次完整保存；已有待处理的请求时直接合并，写入的总是最新数据
+    def schedule_save(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer.start()
+        try:
+            self._save_queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _writer_loop(self):
+        while True:
+            self._save_queue.get()
+            try:
+                self.save()
+            except Exception as e:
+                # keep the thread alive, otherwise flush()/close() would wait on the queue forever
+                print("Background save failed:", e)
+            finally:
+                self._save_queue.task_done()
+
+    #写出延迟的配置修改，并等待后台写线程处理完所有保存请求
+    def flush(self):
+        self.flush_dirty()
+        self._save_queue.join()
+
+    def _reset_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._ops_since_compact = 0
+
+    #把日志合并进数据文件（没有未合并的操作时什么都不做）
+    def compact(self, durable: bool = False):
+        if self._ops_since_compact:
+            self.save(durable)
+
+    #正常退出时调用：合并日志并关闭文件句柄
+    def close(self):
+        self.flush()
+        with self._lock:
+            self.compact(durable=True)
+            if self._log is not None:
+                self._log.close()
+                self._log = None
 
     #获取/设置收支记录和借款记录
     # Records
     def get_records(self) -> List[Record]:
-        return [Record.from_dict(d) for d in self._data.get('records', [])]
+        return list(map(Record.from_dict_fast, self._data.get('records', [])))
 
-    def set_records(self, records: List[Record]):
+    #以下 set_*/update_* 默认立即保存；save=False 时只改内存数据，由调用方在批量修改后统一 save() 一次
+    def set_records(self, records: List[Record], save: bool = True):
         self._data['records'] = [r.to_dict() for r in records]
-        self.save()
+        if save:
+            self.save()
+
+    #直接返回内部维护的记录字典列表（与 User 中的对象保持同步），只读使用
+    def get_record_dicts(self) -> List[Dict[str, Any]]:
+        return self._data.get('records', [])
+
+    def get_loan_dicts(self) -> List[Dict[str, Any]]:
+        return self._data.get('loans', [])
 
     def get_loans(self) -> List[LoanRecord]:
         return [LoanRecord.from_dict(d) for d in self._data.get('loans', [])]
 
-    def set_loans(self, loans: List[LoanRecord]):
+    def set_loans(self, loans: List[LoanRecord], save: bool = True):
         self._data['loans'] = [l.to_dict() for l in loans]
-        self.save()
+        if save:
+            self.save()
 
     #设置相关方法
     def get_settings(self) -> Dict[str, Any]:
         return self._data.get('settings', {})
 
-    def update_settings(self, settings: Dict[str, Any]):
+    def update_settings(self, settings: Dict[str, Any], save: bool = True):
+        self._dirty.pop('settings', None)
         self._data['settings'].update(settings)
-        self.save()
+        if save:
+            self.save()
 
     def get_overconsumption_categories(self) -> List[str]:
         return self._data.get('overconsumption_categories', [])
 
-    def set_overconsumption_categories(self, cats: List[str]):
+    def set_overconsumption_categories(self, cats: List[str], save: bool = True):
+        self._dirty.pop('overconsumption_categories', None)
         self._data['overconsumption_categories'] = cats
-        self.save()
+        if save:
+            self.save()
+
+    #批量替换多个数据段（None 表示该段不变），所有修改完成后只写一次磁盘
+    def bulk_set(self, records: Optional[List[Record]] = None, loans: Optional[List[LoanRecord]] = None,
+                 settings: Optional[Dict[str, Any]] = None, overcats: Optional[List[str]] = None):
+        with self._lock:
+            if records is not None:
+                self.set_records(records, save=False)
+            if loans is not None:
+                self.set_loans(loans, save=False)
+            if settings is not None:
+                self.update_settings(settings, save=False)
+            if overcats is not None:
+                self.set_overconsumption_categories(overcats, save=False)
+            self.save()
 
 
 class User:
     """Represents a user who manages records and loans."""
     def __init__(self, storage: Storage):
         self.storage = storage
-        self.records: List[Record] = storage.get_records()
-        self.loans: List[LoanRecord] = storage.get_loans()
+        self._listeners: List[Callable[[], None]] = []
+        self._version = 0  # bumped on every record change; Statistics caches key on it
+        self._columns_cache: Optional[Tuple[int, _RecordColumns]] = None
+        # category table: name -> small int code, grown as new categories show up
+        self._cat_index: Dict[str, int] = {}
+        self._cat_names: List[str] = []
+        self.records = storage.get_records()
+        self.loans = storage.get_loans()
         self.settings = storage.get_settings()
         self.overcats = set(storage.get_overconsumption_categories())
 
+    #收支记录列表；整体赋值时（导入/恢复）重建 id 索引并重新计算缓存的收支净额
+    @property
+    def records(self) -> List[Record]:
+        return self._records
+
+    @records.setter
+    def records(self, records: List[Record]):
+        self._records = records
+        self._rec_by_id: Dict[str, Record] = {r.id: r for r in records}
+        # (ts_epoch, id) keys kept in ascending time order via bisect.insort
+        self._by_time: List[Tuple[int, str]] = sorted((r.ts_epoch, r.id) for r in records)
+        self._net = self._sum_net(records)
+        # month code -> [income, expense, record count], adjusted on every record change
+        self._monthly: Dict[int, List[Any]] = {}
+        for r in records:
+            self._month_add(r, 1)
+        self._version += 1
+        self._notify_change()
+
+    #借款记录列表；整体赋值时重建 id 索引
+    @property
+    def loans(self) -> List[LoanRecord]:
+        return self._loans
+
+    @loans.setter
+    def loans(self, loans: List[LoanRecord]):
+        self._loans = loans
+        self._loan_by_id: Dict[str, LoanRecord] = {l.id: l for l in loans}
+        # (due date, id) of unpaid loans with a due date, in ascending due order
+        self._due_loans: List[Tuple[datetime.date, str]] = sorted(
+            (l.due_date_obj, l.id) for l in loans if l.due_date_obj and not l.repaid)
+        self._notify_change()
+
+    #返回到期日不晚于 today 的未还借款，按到期日排序；二分查找，O(log N)
+    def due_loans(self, today: datetime.date) -> List[LoanRecord]:
+        due = self._due_loans
+        hi = bisect.bisect_right(due, today, key=lambda k: k[0])
+        return [self._loan_by_id[lid] for _, lid in due[:hi]]
+
+    def _unindex_due(self, loan: LoanRecord):
+        if loan.due_date_obj:
+            key = (loan.due_date_obj, loan.id)
+            i = bisect.bisect_left(self._due_loans, key)
+            if i < len(self._due_loans) and self._due_loans[i] == key:
+                del self._due_loans[i]
+
+    #注册数据变化回调（如提醒服务据此立即重新检查）；回调可能在任意线程中被调用
+    def add_change_listener(self, callback: Callable[[], None]):
+        self._listeners.append(callback)
+
+    def _notify_change(self):
+        for cb in self._listeners:
+            cb()
+
+    #按时间倒序（最新在前）返回记录；有序键随增删改维护，无需每次全量排序
+    def records_by_time(self) -> List[Record]:
+        by_id = self._rec_by_id
+        return [by_id[rid] for _, rid in reversed(self._by_time)]
+
+    def _unindex_time(self, key: Tuple[int, str]):
+        i = bisect.bisect_left(self._by_time, key)
+        if i < len(self._by_time) and self._by_time[i] == key:
+            del self._by_time[i]
+
+    #按 id 查找记录/借款，O(1)
+    def get_record(self, record_id: str) -> Optional[Record]:
+        return self._rec_by_id.get(record_id)
+
+    def get_loan(self, loan_id: str) -> Optional[LoanRecord]:
+        return self._loan_by_id.get(loan_id)
+
+    #按时间排序的列式视图；记录变化后在下次访问时重建
+    def _columns(self) -> _RecordColumns:
+        if self._columns_cache is None or self._columns_cache[0] != self._version:
+            by_id = self._rec_by_id
+            recs = [by_id[rid] for _, rid in self._by_time]
+            cat_index = self._cat_index
+            names_before = len(cat_index)
+            cols = _RecordColumns(
+                ts_epoch=array('q', [r.ts_epoch for r in recs]),
+                amounts=array('d', [r.amount for r in recs]),
+                is_income=array('b', [r.kind == 'income' for r in recs]),
+                is_expense=array('b', [r.kind != 'income' for r in recs]),
+                cat_codes=array('i', [cat_index.setdefault(r.category, len(cat_index)) for r in recs]),
+            )
+            if len(cat_index) != names_before:
+                self._cat_names = list(cat_index)
+            self._columns_cache = (self._version, cols)
+        return self._columns_cache[1]
+
+    #把记录计入(sign=1)或移出(sign=-1)所在月份的汇总；月内已无记录时删除该桶，避免浮点残差累积
+    def _month_add(self, r: Record, sign: int):
+        code = r.month_code
+        if code < 0:
+            return
+        b = self._monthly.get(code)
+        if b is None:
+            b = self._monthly[code] = [0.0, 0.0, 0]
+        b[0 if r.kind == 'income' else 1] += sign * r.amount
+        b[2] += sign
+        if b[2] == 0:
+            del self._monthly[code]
+
+    #整表计算收支净额：单次遍历、两个局部累加器，不逐条调用 _signed，也不生成中间列表
+    @staticmethod
+    def _sum_net(records: List[Record]) -> float:
+        income = 0.0
+        expense = 0.0
+        for r in records:
+            if r.kind == 'income':
+                income += r.amount
+            else:
+                expense += r.amount
+        return income - expense
+
+    #收入记为正、支出记为负
+    @staticmethod
+    def _signed(r: Record) -> float:
+        return r.amount if r.kind == 'income' else -r.amount
+
     # Record operations
     def add_record(self, amount: float, kind: str, category: str, timestamp: Optional[str] = None, note: str = '') -> Record:
         '''
@@ -156,7 +658,13 @@ class User:
         rec = Record(id=rid, amount=float(amount), kind=kind, category=category, timestamp=ts, note=note,
                      overconsumption_mark=(category in self.overcats))
         self.records.append(rec)
-        self.storage.set_records(self.records)
+        self._rec_by_id[rid] = rec
+        bisect.insort(self._by_time, (rec.ts_epoch, rid))
+        self._month_add(rec, 1)
+        self._net += self._signed(rec)
+        self._version += 1
+        self.storage.append_op('add_record', rec.to_dict())
+        self._notify_change()
         return rec
 
     def update_record(self, record_id: str, **kwargs) -> Optional[Record]:
@@ -165,22 +673,39 @@ class User:
         参数: 记录ID和要更新的字段键值对
         返回: 更新后的记录对象或None(如果未找到)
         '''
-        for r in self.records:
-            if r.id == record_id:
-                for k, v in kwargs.items():
-                    if hasattr(r, k):
-                        setattr(r, k, v)
-                self.storage.set_records(self.records)
-                return r
-        return None
+        r = self._rec_by_id.get(record_id)
+        if r is None:
+            return None
+        old = self._signed(r)
+        old_key = (r.ts_epoch, r.id)
+        self._month_add(r, -1)
+        for k, v in kwargs.items():
+            if hasattr(r, k):
+                setattr(r, k, v)
+        r._sync_derived()
+        self._month_add(r, 1)
+        if (r.ts_epoch, r.id) != old_key:
+            self._unindex_time(old_key)
+            bisect.insort(self._by_time, (r.ts_epoch, r.id))
+        self._net += self._signed(r) - old
+        self._version += 1
+        self.storage.append_op('update_record', r.to_dict())
+        self._notify_change()
+        return r
 
     def delete_record(self, record_id: str) -> bool:
-        orig = len(self.records)
-        self.records = [r for r in self.records if r.id != record_id]
-        changed = len(self.records) != orig
-        if changed:
-            self.storage.set_records(self.records)
-        return changed
+        rec = self._rec_by_id.pop(record_id, None)
+        if rec is None:
+            return False
+        self._unindex_time((rec.ts_epoch, rec.id))
+        self._month_add(rec, -1)
+        # keeps insertion order, the same order Storage keeps the record dicts in
+        self.records.remove(rec)
+        self._net -= self._signed(rec)
+        self._version += 1
+        self.storage.append_op('delete_record', {'id': record_id})
+        self._notify_change()
+        return True
 
     # Loan operations
     def add_loan(self, name: str, amount: float, loan_date: Optional[str] = None, due_date: Optional[str] = None, note: str = '') -> LoanRecord:
@@ -188,94 +713,114 @@ class User:
         loan_date = loan_date or now_iso()
         loan = LoanRecord(id=lid, name=name, amount=float(amount), loan_date=loan_date, due_date=due_date, note=note)
         self.loans.append(loan)
-        self.storage.set_loans(self.loans)
+        self._loan_by_id[lid] = loan
+        if loan.due_date_obj:
+            bisect.insort(self._due_loans, (loan.due_date_obj, lid))
+        self.storage.append_op('add_loan', loan.to_dict())
+        self._notify_change()
         return loan
 
     #标记借款为已还款状态
     def mark_loan_repaid(self, loan_id: str) -> bool:
-        for l in self.loans:
-            if l.id == loan_id:
-                l.repaid = True
-                self.storage.set_loans(self.loans)
-                return True
-        return False
+        l = self._loan_by_id.get(loan_id)
+        if l is None:
+            return False
+        if not l.repaid:
+            self._unindex_due(l)
+        l.repaid = True
+        self.storage.append_op('update_loan', l.to_dict())
+        self._notify_change()
+        return True
 
     def delete_loan(self, loan_id: str) -> bool:
-        orig = len(self.loans)
-        self.loans = [l for l in self.loans if l.id != loan_id]
-        changed = len(self.loans) != orig
-        if changed:
-            self.storage.set_loans(self.loans)
-        return changed
+        loan = self._loan_by_id.pop(loan_id, None)
+        if loan is None:
+            return False
+        self._unindex_due(loan)
+        self.loans.remove(loan)
+        self.storage.append_op('delete_loan', {'id': loan_id})
+        self._notify_change()
+        return True
 
     # Settings and overconsumption categories
     #设置余额预警阈值
     def set_thresholds(self, warn: float, urgent: float):
         self.settings['threshold_warn'] = float(warn)
         self.settings['threshold_urgent'] = float(urgent)
-        self.storage.update_settings(self.settings)
+        self.storage.mark_dirty('settings', self.settings)
+        self._notify_change()
 
     #设置初始余额
     def set_initial_balance(self, amount: float):
         self.settings['initial_balance'] = float(amount)
-        self.storage.update_settings(self.settings)
+        self.storage.mark_dirty('settings', self.settings)
+        self._notify_change()
 
     #添加/移除过度消费类别
     def add_overconsumption_category(self, cat: str):
         self.overcats.add(cat)
-        self.storage.set_overconsumption_categories(list(self.overcats))
+        self.storage.mark_dirty('overconsumption_categories', self.overcats)
 
     def remove_overconsumption_category(self, cat: str):
         if cat in self.overcats:
             self.overcats.remove(cat)
-            self.storage.set_overconsumption_categories(list(self.overcats))
+            self.storage.mark_dirty('overconsumption_categories', self.overcats)
 
-    #计算当前余额
+    #计算当前余额（收支净额随每次增删改增量维护，O(1)）
     def get_balance(self) -> float:
         # balance = initial_balance + sum(incomes) - sum(expenses)
-        bal = float(self.settings.get('initial_balance', 0.0))
-        for r in self.records:
-            if r.kind == 'income':
-                bal += r.amount
-            else:
-                bal -= r.amount
-        return bal
-    def create_backup(self, backup_path: str = None) -> str:
+        return float(self.settings.get('initial_balance', 0.0)) + self._net
+    #导出/备份用的完整数据；记录和借款直接复用存储层已序列化好的字典，无需逐条 to_dict
+    def export_data(self) -> Dict[str, Any]:
+        return {
+            'records': self.storage.get_record_dicts(),
+            'loans': self.storage.get_loan_dicts(),
+            'settings': self.settings,
+            'overconsumption_categories': list(self.overcats)
+        }
+
+    #创建备份文件；默认紧凑格式，pretty=True 时缩进输出便于阅读
+    def create_backup(self, backup_path: str = None, pretty: bool = False) -> str:
         if backup_path is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = f"backup_expense_{timestamp}.json"
         try:
-            backup_data = {
-                'records': [r.to_dict() for r in self.records],
-                'loans': [l.to_dict() for l in self.loans],
-                'settings': self.settings,
-                'overconsumption_categories': list(self.overcats),
-                'backup_time': now_iso(),
-                'version': '1.0'
-            }
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, ensure_ascii=False, indent=2)
+            backup_data = self.export_data()
+            backup_data['backup_time'] = now_iso()
+            backup_data['version'] = '1.0'
+            # encode fully in memory, then hand the kernel one contiguous buffer
+            _write_atomic(backup_path, _json_dumps(backup_data, indent=pretty))
             return backup_path
         except Exception as e:
             raise Exception(f"备份失败: {str(e)}")
+
+    #用导入/备份的数据替换对应的数据段（文件中没有的段保持不变），只写一次磁盘，并通知监听者
+    def import_data(self, data: Dict[str, Any]):
+        records = data.get('records')
+        if records is not None:
+            records = self.records = list(map(Record.from_dict_fast, records))
+        loans = data.get('loans')
+        if loans is not None:
+            loans = self.loans = [LoanRecord.from_dict(d) for d in loans]
+        settings = data.get('settings')
+        if settings is not None:
+            self.settings.update(settings)
+        # 解析出的列表直接交给存储层，不再 set -> list 往返复制
+        cats = data.get('overconsumption_categories')
+        if cats is not None:
+            self.overcats = set(cats)
+        self.storage.bulk_set(records, loans, None if settings is None else self.settings, cats)
+        # settings may have lowered the balance or thresholds: wake the reminder check
+        self._notify_change()
+
     def restore_from_backup(self, backup_path: str) -> bool:
         try:
-            with open(backup_path, 'r', encoding='utf-8') as f:
-                backup_data = json.load(f)
+            backup_data = _read_json(backup_path)
             required_keys = ['records', 'loans', 'settings']
             if not all(key in backup_data for key in required_keys):
                 raise ValueError("无效的备份文件格式")
             # 恢复数据 → 直接赋值给 self，不是 self.user
-            self.records = [Record.from_dict(d) for d in backup_data['records']]
-            self.loans = [LoanRecord.from_dict(d) for d in backup_data['loans']]
-            self.settings.update(backup_data['settings'])
-            if 'overconsumption_categories' in backup_data:
-                self.overcats = set(backup_data['overconsumption_categories'])
-            # 保存到 storage
-            self.storage.set_records(self.records)
-            self.storage.set_loans(self.loans)
-            self.storage.update_settings(self.settings)
-            self.storage.set_overconsumption_categories(list(self.overcats))
+            self.import_data(backup_data)
             return True
         except Exception as e:
             raise Exception(f"恢复失败: {str(e)}")
@@ -285,71 +830,83 @@ class Statistics:
     """Compute statistics (total income/expense, category breakdowns, monthly series)."""
     def __init__(self, user: User):
         self.user = user
+        self._cache: Dict[Any, Any] = {}
+        self._cache_version = user._version
+
+    #按 key 缓存计算结果；记录一旦变化（版本号改变）整个缓存失效
+    def _cached(self, key, compute):
+        if self._cache_version != self.user._version:
+            self._cache.clear()
+            self._cache_version = self.user._version
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
 
     #计算指定时间范围内的总收入、总支出和余额
     def totals(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, float]:
-        income = 0.0
-        expense = 0.0
-        recs = self.filter_records(start, end)
-        for r in recs:
-            if r.kind == 'income':
-                income += r.amount
-            else:
-                expense += r.amount
+        income, expense = self._cached(('totals', start, end), lambda: self._sum_totals(start, end))
         return {'income': income, 'expense': expense, 'balance': income - expense + float(self.user.settings.get('initial_balance', 0.0))}
 
+    def _sum_totals(self, start: Optional[str], end: Optional[str]) -> Tuple[float, float]:
+        cols = self.user._columns()
+        lo, hi = self._window(cols, start, end)
+        amounts = cols.amounts[lo:hi]
+        # sum() over compress() runs entirely in C, no per-record Python branch
+        income = sum(compress(amounts, cols.is_income[lo:hi]), 0.0)
+        expense = sum(compress(amounts, cols.is_expense[lo:hi]), 0.0)
+        return income, expense
+
+    #时间范围 [start, end) 在按时间排序的列中对应的下标区间
+    @staticmethod
+    def _window(cols: _RecordColumns, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        lo = bisect.bisect_left(cols.ts_epoch, iso_to_epoch(start)) if start else 0
+        hi = bisect.bisect_left(cols.ts_epoch, iso_to_epoch(end)) if end else len(cols.ts_epoch)
+        return lo, max(lo, hi)
+
     #按类别统计支出分布，收入统一归到"Income"类别
     def category_breakdown(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, float]:
-        buckets: Dict[str, float] = {}
-        recs = self.filter_records(start, end)
-        for r in recs:
-            buckets.setdefault(r.category, 0.0)
-            if r.kind == 'expense':
-                buckets[r.category] += r.amount
-            else:
-                # include income under 'Income' bucket
-                buckets.setdefault('Income', 0.0)
-                buckets['Income'] += r.amount
+        # copy so callers can't modify the cached buckets
+        return dict(self._cached(('breakdown', start, end), lambda: self._sum_breakdown(start, end)))
+
+    def _sum_breakdown(self, start: Optional[str], end: Optional[str]) -> Dict[str, float]:
+        cols = self.user._columns()
+        lo, hi = self._window(cols, start, end)
+        codes, amounts = cols.cat_codes[lo:hi], cols.amounts[lo:hi]
+        is_income, is_expense = cols.is_income[lo:hi], cols.is_expense[lo:hi]
+        names = self.user._cat_names
+        # group by integer code into a flat list instead of hashing strings per record
+        sums = [0.0] * len(names)
+        for code, amount in zip(compress(codes, is_expense), compress(amounts, is_expense)):
+            sums[code] += amount
+        # every category in range gets a bucket, income-only ones stay at 0
+        buckets: Dict[str, float] = {names[c]: sums[c] for c in sorted(set(codes))}
+        if any(is_income):
+            # include income under 'Income' bucket
+            buckets['Income'] = buckets.get('Income', 0.0) + sum(compress(amounts, is_income))
         return buckets
 
+    #读取某个月份序号（见 _month_code）的 (收入, 支出)；月度汇总由 User 增量维护
+    def _month_totals(self, code: int) -> Tuple[float, float]:
+        b = self.user._monthly.get(code)
+        return (b[0], b[1]) if b else (0.0, 0.0)
+
     #生成最近N个月的月度收支序列数据
     def monthly_series(self, months: int = 6) -> List[Tuple[str, float, float]]:
         """Return last `months` months series of (month_label, income, expense)."""
         today = datetime.date.today()
-        results: List[Tuple[str, float, float]] = []
-        for i in range(months-1, -1, -1):
-            first = (today.replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
-            # compute month offset
-            y = today.year
-            m = today.month - i
-            while m <= 0:
-                y -= 1
-                m += 12
-            start = datetime.date(y, m, 1)
-            if m == 12:
-                end = datetime.date(y+1, 1, 1)
-            else:
-                end = datetime.date(y, m+1, 1)
-            start_iso = datetime.datetime.combine(start, datetime.time.min).isoformat()
-            end_iso = datetime.datetime.combine(end, datetime.time.min).isoformat()
-            inc = 0.0
-            exp = 0.0
-            for r in self.filter_records(start_iso, end_iso):
-                if r.kind == 'income':
-                    inc += r.amount
-                else:
-                    exp += r.amount
-            results.append((start.strftime('%Y-%m'), inc, exp))
-        return results
-
-    #根据时间范围过滤记录
+        return list(self._cached(('monthly', months, today), lambda: self._build_series(months, today)))
+
+    def _build_series(self, months: int, today: datetime.date) -> List[Tuple[str, float, float]]:
+        first, labels = _month_window(months, today)
+        return [(label, *self._month_totals(first + i)) for i, label in enumerate(labels)]
+
+    #根据时间范围过滤记录，按时间升序返回
     def filter_records(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Record]:
-        recs = self.user.records
-        if start:
-            recs = [r for r in recs if r.timestamp >= start]
-        if end:
-            recs = [r for r in recs if r.timestamp < end]
-        return recs
+        by_time, by_id = self.user._by_time, self.user._rec_by_id
+        # (epoch,) sorts before every (epoch, id), so bisect lands on the first record at that time
+        lo = bisect.bisect_left(by_time, (iso_to_epoch(start),)) if start else 0
+        hi = bisect.bisect_left(by_time, (iso_to_epoch(end),)) if end else len(by_time)
+        return [by_id[rid] for _, rid in by_time[lo:max(lo, hi)]]
     def yearly_summary(self, year: int = None) -> Dict[str, Any]:
         """获取年度收支总结，包括月度趋势和分类占比"""
         if year is None:
@@ -358,19 +915,13 @@ class Statistics:
         start_date = f"{year}-01-01T00:00:00"
         end_date = f"{year+1}-01-01T00:00:00"
         
-        year_records = self.filter_records(start_date, end_date)
-        
         monthly_data = []
+        total_income = 0.0
+        total_expense = 0.0
         for month in range(1, 13):
-            month_start = f"{year}-{month:02d}-01T00:00:00"
-            if month == 12:
-                month_end = f"{year+1}-01-01T00:00:00"
-            else:
-                month_end = f"{year}-{month+1:02d}-01T00:00:00"
-            
-            month_records = self.filter_records(month_start, month_end)
-            month_income = sum(r.amount for r in month_records if r.kind == 'income')
-            month_expense = sum(r.amount for r in month_records if r.kind == 'expense')
+            month_income, month_expense = self._month_totals(year * 12 + month - 1)
+            total_income += month_income
+            total_expense += month_expense
             monthly_data.append({
                 'month': f"{year}-{month:02d}",
                 'income': month_income,
@@ -378,9 +929,6 @@ class Statistics:
                 'balance': month_income - month_expense
             })
         
-        total_income = sum(r.amount for r in year_records if r.kind == 'income')
-        total_expense = sum(r.amount for r in year_records if r.kind == 'expense')
-        
         return {
             'year': year,
             'total_income': total_income,
@@ -399,25 +947,34 @@ class ReminderService:
         self.ui_callback = ui_callback  # function to call for UI actions (message display)
         self._timer = None
         self._stop_event = threading.Event()
+        self._dirty = threading.Event()  # set by User whenever balance/loans/thresholds change
         self._warned_urgent = False  # ← 先初始化所有属性
-        self._check_interval = 10  # seconds for demo; in real app, could be 60+
+        self._warned_low = False
+        # checks run on every change; this timeout only makes loan due dates fire as days pass
+        self._check_interval = 3600
+        user.add_change_listener(self.notify_change)
         self._thread = threading.Thread(target=self._run_loop, daemon=True)
         self._thread.start()
-        self._warned_low = False
-        
-    #后台线程的主循环，定期检查各种提醒条件
+
+    #数据发生变化时由 User 调用，唤醒后台线程立即检查
+    def notify_change(self):
+        self._dirty.set()
+
+    #后台线程的主循环：数据变化时立即检查，否则每隔 _check_interval 检查一次
     def _run_loop(self):
         while not self._stop_event.is_set():
+            self._dirty.clear()
             try:
                 self.check_thresholds()
                 self.check_loans()
             except Exception as e:
                 print("ReminderService loop error:", e)
-            self._stop_event.wait(self._check_interval)
+            self._dirty.wait(self._check_interval)
 
     #停止提醒服务线程
     def stop(self):
         self._stop_event.set()
+        self._dirty.set()
         if self._thread.is_alive():
             self._thread.join(timeout=1.0)
     #检查余额是否低于预警/紧急阈值
@@ -452,22 +1009,15 @@ class ReminderService:
             self._notify('over', f'检测到可能的过度消费：{record.category}，金额：{record.amount:.2f}')
     # 检查是否有到期的未还款借款
     def check_loans(self):
-        today = datetime.date.today()
-        for l in self.user.loans:
-            if l.due_date and not l.repaid:
-                try:
-                    dd = datetime.datetime.fromisoformat(l.due_date).date()
-                    if dd <= today:
-                        self._notify('loan', f'借款到期：{l.name} 金额 {l.amount:.2f} 应还日期 {l.due_date}')
-                except Exception:
-                    pass
+        for l in self.user.due_loans(datetime.date.today()):
+            self._notify('loan', f'借款到期：{l.name} 金额 {l.amount_text} 应还日期 {l.due_date}')
     #设置每日提醒（当前仅存储设置，未完全实现）
     def schedule_daily_reminder(self, time_hhmm: str, enabled: bool):
         # For simplicity, we will not schedule a strict daily system notification here.
         # Instead, we store setting and UIController may use it to show a dialog
         self.user.settings['reminder_enabled'] = bool(enabled)
         self.user.settings['reminder_time'] = time_hhmm
-        self.user.storage.update_settings(self.user.settings)
+        self.user.storage.mark_dirty('settings', self.user.settings)
 
     #发送提醒消息到UI回调函数
     def _notify(self, kind: str, message: str):
@@ -481,17 +1031,43 @@ class ReminderService:
 
 # ----------------------------- GUI Layer ------------------------------------
 
+_PIE_COLORS = ('#ff9999', '#99ccff', '#ffd699', '#c2f0c2', '#dcb2ff', '#f7b2d9', '#b3e6ff')
+
+# (column id, heading, width) for each table
+_RECORD_COLS = (('amount', '金额', 100), ('kind', '类型', 70), ('category', '类别', 100),
+                ('time', '时间', 150), ('note', '备注', 160))
+_LOAN_COLS = (('name', '借款人', 100), ('amount', '金额', 90), ('loan_date', '借出日期', 150),
+              ('due_date', '到期', 150), ('repaid', '已还', 50))
+_STATS_COLS = (('month', '月份', 90), ('income', '收入', 100), ('expense', '支出', 100))
+
+#按列定义创建只显示表头的 Treeview，列配置在创建时一次完成
+def _make_table(parent, cols, **options) -> ttk.Treeview:
+    anchor = options.pop('anchor', 'w')
+    tree = ttk.Treeview(parent, columns=tuple(c for c, _, _ in cols), show='headings', **options)
+    for c, title, width in cols:
+        tree.heading(c, text=title)
+        tree.column(c, width=width, anchor=anchor)
+    return tree
+
 class UIController:
     """Tkinter-based GUI controller that connects User, Statistics, ReminderService."""
+    RECORDS_PAGE = 200  # rows inserted into the record list per batch
+    REMINDER_POLL_MS = 100  # how often the Tk thread drains queued reminders
+    TOAST_MS = 1500  # how long the success toast stays up
+    _REMINDER_TITLES = {'urgent': '紧急提醒', 'warn': '余额预警', 'over': '过度消费提示', 'loan': '借款提醒'}
+
     #初始化主界面控制器
     def __init__(self, root: tk.Tk, user: User):
         self.root = root
         self.user = user
         self.stats = Statistics(user)
+        # reminders from the background thread; only the Tk thread touches widgets, via _poll_reminders
+        self._reminder_q: queue.SimpleQueue = queue.SimpleQueue()
         self.reminder = ReminderService(user, ui_callback=self.on_reminder)
         self.root.title('记账本系统 - Expense Manager')
         self.create_widgets()
         self.refresh_records_list()
+        self.root.after(self.REMINDER_POLL_MS, self._poll_reminders)
 
     def create_widgets(self):
         '''
@@ -520,6 +1096,7 @@ class UIController:
         ttk.Button(top, text='设置余额', command=self.on_set_balance).pack(side=tk.LEFT)
         ttk.Button(top, text='阈值设置', command=self.on_set_thresholds).pack(side=tk.LEFT, padx=6)
         ttk.Button(top, text='导入/导出', command=self.on_import_export).pack(side=tk.LEFT, padx=6)
+        ttk.Button(top, text='导出(可读格式)', command=self.on_export_pretty).pack(side=tk.LEFT, padx=6)
 
         # Middle: Records list and controls
         mid = ttk.Frame(self.root)
@@ -539,15 +1116,15 @@ class UIController:
         ttk.Button(btn_frame, text='统计视图', command=self.on_show_stats).pack(side=tk.LEFT, padx=6)
 
         # Record list
-        self.tree = ttk.Treeview(left, columns=('amount', 'kind', 'category', 'time', 'note'), show='headings', selectmode='browse')
-        for col, title in [('amount', '金额'), ('kind', '类型'), ('category', '类别'), ('time', '时间'), ('note', '备注')]:
-            self.tree.heading(col, text=title)
-            self.tree.column(col, width=100, anchor='center')
+        self.tree = _make_table(left, _RECORD_COLS, selectmode='browse', anchor='center')
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         vsb = ttk.Scrollbar(left, orient="vertical", command=self.tree.yview)
         vsb.pack(side=tk.LEFT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=vsb.set)
+        self._tree_vsb = vsb
+        self._tree_records: List[Record] = []  # newest first; only the first _tree_loaded are in the tree
+        self._tree_loaded = 0
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
 
         # Right: simple category pie visualization and overconsumption list
         right = ttk.Frame(mid, width=240)
@@ -575,6 +1152,18 @@ class UIController:
     def update_status(self, msg: str):
         self.status_var.set(f'状态: {msg}')
 
+    #非模态的成功提示：更新状态栏，并在主窗口右下角弹出一个到时自动关闭的小提示框
+    def notify(self, msg: str):
+        self.update_status(msg)
+        toast = tk.Toplevel(self.root)
+        toast.overrideredirect(True)
+        ttk.Label(toast, text=msg, padding=(12, 6), relief='solid').pack()
+        toast.update_idletasks()
+        x = self.root.winfo_rootx() + self.root.winfo_width() - toast.winfo_width() - 16
+        y = self.root.winfo_rooty() + self.root.winfo_height() - toast.winfo_height() - 16
+        toast.geometry(f'+{max(x, 0)}+{max(y, 0)}')
+        toast.after(self.TOAST_MS, toast.destroy)
+
     # 更新余额显示，并根据阈值改变颜色
     def update_balance_var(self):
         bal = self.user.get_balance()
@@ -590,16 +1179,33 @@ class UIController:
             color = '#52c41a'  # green
         self.balance_label.configure(foreground=color)
 
-    # 刷新记录列表显示，按时间倒序排列
+    # 刷新记录列表显示，按时间倒序排列；只先插入第一页，滚动到底部附近时再续加
     def refresh_records_list(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for r in sorted(self.user.records, key=lambda x: x.timestamp, reverse=True):
-            self.tree.insert('', tk.END, iid=r.id, values=(f'{r.amount:.2f}', r.kind, r.category, r.timestamp, r.note))
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)  # one Tcl call instead of one per row
+        self._tree_records = self.user.records_by_time()
+        self._tree_loaded = 0
+        self._load_more_records()
         self.update_balance_var()
         self.update_overconsumption_list()
         self.draw_pie_chart()
 
+    #向记录列表追加下一页
+    def _load_more_records(self):
+        start = self._tree_loaded
+        page = self._tree_records[start:start + self.RECORDS_PAGE]
+        insert = self.tree.insert
+        for r in page:
+            insert('', tk.END, iid=r.id, values=(r.amount_text, r.kind, r.category, r.timestamp, r.note))
+        self._tree_loaded = start + len(page)
+
+    #记录列表的 yscrollcommand：同步滚动条，视图接近底部且还有未插入的记录时加载下一页
+    def _on_tree_scroll(self, first: str, last: str):
+        self._tree_vsb.set(first, last)
+        if float(last) >= 0.9 and self._tree_loaded < len(self._tree_records):
+            self._load_more_records()
+
     # 更新过度消费类别列表显示
     def update_overconsumption_list(self):
         self.over_listbox.delete(0, tk.END)
@@ -615,23 +1221,23 @@ class UIController:
         if total <= 0:
             self.canvas.create_text(110, 110, text='无支出数据', fill='#999')
             return
+        # compute all slice geometry first, then issue the canvas calls in one batch
+        slices = []
         start = 0
-        colors = ['#ff9999', '#99ccff', '#ffd699', '#c2f0c2', '#dcb2ff', '#f7b2d9', '#b3e6ff']
-        i = 0
         for k, v in breakdown.items():
             if k == 'Income':
                 continue
             extent = int(360 * (v / total))
-            color = colors[i % len(colors)]
-            self.canvas.create_arc(10, 10, 210, 210, start=start, extent=extent, fill=color, outline='white')
             # label position: compute midpoint angle
-            mid = (start + start + extent) / 2
-            import math
-            angle = math.radians(mid)
-            cx, cy = 110 + 70 * math.cos(angle), 110 + 70 * math.sin(angle)
-            self.canvas.create_text(cx, cy, text=k, font=('Arial', 8))
+            angle = math.radians(start + extent / 2)
+            slices.append((start, extent, _PIE_COLORS[len(slices) % len(_PIE_COLORS)], k,
+                           110 + 70 * math.cos(angle), 110 + 70 * math.sin(angle)))
             start += extent
-            i += 1
+        create_arc, create_text = self.canvas.create_arc, self.canvas.create_text
+        for start, extent, color, _, _, _ in slices:
+            create_arc(10, 10, 210, 210, start=start, extent=extent, fill=color, outline='white')
+        for _, _, _, label, cx, cy in slices:
+            create_text(cx, cy, text=label, font=('Arial', 8))
     def on_backup_data(self):
         """备份数据菜单项"""
         path = filedialog.asksaveasfilename(
@@ -678,7 +1284,7 @@ class UIController:
             messagebox.showinfo('提示', '请先选择一条记录')
             return
         rid = sel[0]
-        rec = next((r for r in self.user.records if r.id == rid), None)
+        rec = self.user.get_record(rid)
         if not rec:
             messagebox.showerror('错误', '未找到记录')
             return
@@ -768,68 +1374,76 @@ class UIController:
         win = StatsWindow(self.root, stats=self.stats)
         win.show()
 
+    #导出全部数据到 JSON 文件；默认紧凑格式，pretty=True 时缩进输出
+    def export_to(self, path: str, pretty: bool = False):
+        _write_atomic(path, _json_dumps(self.user.export_data(), indent=pretty))
+
+    #选择保存位置并导出
+    def _export_with_dialog(self, pretty: bool = False):
+        path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[('JSON', '*.json')])
+        if path:
+            try:
+                self.export_to(path, pretty=pretty)
+                self.notify(f'已导出到 {path}')
+            except Exception as e:
+                messagebox.showerror('错误', str(e))
+
+    #导出为带缩进、便于人工阅读的 JSON
+    def on_export_pretty(self):
+        self._export_with_dialog(pretty=True)
+
     def on_import_export(self):
         # Offer user to import or export data JSON
         if messagebox.askyesno('导出', '导出数据到 JSON 文件？（点击否可选择导入）'):
-            path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[('JSON', '*.json')])
-            if path:
-                try:
-                    with open(path, 'w', encoding='utf-8') as f:
-                        data = {
-                            'records': [r.to_dict() for r in self.user.records],
-                            'loans': [l.to_dict() for l in self.user.loans],
-                            'settings': self.user.settings,
-                            'overconsumption_categories': list(self.user.overcats)
-                        }
-                        json.dump(data, f, ensure_ascii=False, indent=2)
-                        messagebox.showinfo('导出成功', f'已导出到 {path}')
-                except Exception as e:
-                    messagebox.showerror('错误', str(e))
+            self._export_with_dialog()
         else:
             path = filedialog.askopenfilename(filetypes=[('JSON', '*.json')])
             if path:
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        # basic merge/replace behavior
-                        if 'records' in data:
-                            self.user.records = [Record.from_dict(d) for d in data['records']]
-                        if 'loans' in data:
-                            self.user.loans = [LoanRecord.from_dict(d) for d in data['loans']]
-                        if 'settings' in data:
-                            self.user.settings.update(data['settings'])
-                        if 'overconsumption_categories' in data:
-                            self.user.overcats = set(data['overconsumption_categories'])
-                        self.user.storage.set_records(self.user.records)
-                        self.user.storage.set_loans(self.user.loans)
-                        self.user.storage.update_settings(self.user.settings)
-                        self.user.storage.set_overconsumption_categories(list(self.user.overcats))
-                        self.refresh_records_list()
-                        messagebox.showinfo('导入成功', '已成功导入数据')
+                    # basic merge/replace behavior: only sections present in the file are replaced
+                    self.user.import_data(_read_json(path))
+                    self.refresh_records_list()
+                    self.notify('已成功导入数据')
                 except Exception as e:
                     messagebox.showerror('错误', str(e))
 
+    #提醒回调（在 ReminderService 线程中调用）：只入队，不从后台线程调用任何 Tk 接口
     def on_reminder(self, kind: str, message: str):
-        # Called from ReminderService thread; ensure we call tkinter safely
-        def show():
-            if kind == 'urgent':
-                messagebox.showwarning('紧急提醒', message)
-            elif kind == 'warn':
-                messagebox.showinfo('余额预警', message)
-            elif kind == 'over':
-                messagebox.showinfo('过度消费提示', message)
-            elif kind == 'loan':
-                messagebox.showinfo('借款提醒', message)
-            self.update_status(message)
-            self.update_balance_var()
+        self._reminder_q.put((kind, message))
+
+    #Tk 线程中定时轮询提醒队列，然后重新安排下一次轮询
+    def _poll_reminders(self):
         try:
-            self.root.after(0, show)
-        except Exception as e:
-            print("Failed to schedule UI reminder:", e)
+            self._drain_reminders()
+        finally:
+            self.root.after(self.REMINDER_POLL_MS, self._poll_reminders)
+
+    #一次处理所有积压的提醒：同类提醒合并成一个对话框，状态栏和余额只更新一次
+    def _drain_reminders(self):
+        pending = []
+        while True:
+            try:
+                pending.append(self._reminder_q.get_nowait())
+            except queue.Empty:
+                break
+        if not pending:
+            return
+        grouped: Dict[str, List[str]] = {}
+        for kind, message in pending:
+            grouped.setdefault(kind, []).append(message)
+        for kind, messages in grouped.items():
+            title = self._REMINDER_TITLES.get(kind)
+            if title is None:
+                continue
+            show = messagebox.showwarning if kind == 'urgent' else messagebox.showinfo
+            show(title, '\n'.join(messages))
+        self.update_status(pending[-1][1])
+        self.update_balance_var()
 
     def on_close(self):
         if messagebox.askyesno('退出', '确定要退出吗？'):
             self.reminder.stop()
+            self.user.storage.close()
             self.root.destroy()
 
 
@@ -869,13 +1483,18 @@ class RecordDialog(simpledialog.Dialog):
 
         return self.amount_e  # initial focus
 
+    #校验输入；解析后的金额和类别留给 apply 使用，不再重复读取控件
     def validate(self):
         try:
             a = float(self.amount_e.get())
+            if not math.isfinite(a):
+                raise ValueError('金额必须是有效数字')
             if a < 0:
                 raise ValueError('金额应为非负数')
-            if not self.cat_e.get().strip():
+            category = self.cat_e.get().strip()
+            if not category:
                 raise ValueError('类别不能为空')
+            self._amount, self._category = a, category
             return True
         except Exception as e:
             messagebox.showerror('输入错误', str(e))
@@ -883,8 +1502,7 @@ class RecordDialog(simpledialog.Dialog):
 
     def apply(self):
         kind = self.kind_var.get()
-        amount = float(self.amount_e.get())
-        category = self.cat_e.get().strip()
+        amount, category = self._amount, self._category
         timestamp = self.time_e.get().strip() or now_iso()
         note = self.note_e.get('1.0', tk.END).strip()
         self.result = (kind, amount, category, timestamp, note)
@@ -911,6 +1529,9 @@ class LoanDialog(simpledialog.Dialog):
     def validate(self):
         try:
             a = float(self.amount_e.get())
+            if not math.isfinite(a):
+                raise ValueError('non-finite amount')
+            self._amount = a
             return True
         except Exception as e:
             messagebox.showerror('输入错误', '请输入有效金额')
@@ -918,7 +1539,7 @@ class LoanDialog(simpledialog.Dialog):
 
     def apply(self):
         name = self.name_e.get().strip()
-        amount = float(self.amount_e.get())
+        amount = self._amount
         loan_date = self.loan_e.get().strip() or now_iso()
         due_date = self.due_e.get().strip() or None
         note = self.note_e.get('1.0', tk.END).strip()
@@ -932,9 +1553,7 @@ class LoanManager:
         self.win = tk.Toplevel(parent)
         self.win.title('借款管理')
         self.frame = ttk.Frame(self.win); self.frame.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
-        self.tree = ttk.Treeview(self.frame, columns=('name', 'amount', 'loan_date', 'due_date', 'repaid'), show='headings')
-        for c, t in [('name', '借款人'), ('amount', '金额'), ('loan_date', '借出日期'), ('due_date', '到期'), ('repaid', '已还')]:
-            self.tree.heading(c, text=t); self.tree.column(c, width=100)
+        self.tree = _make_table(self.frame, _LOAN_COLS)
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         vsb = ttk.Scrollbar(self.frame, orient='vertical', command=self.tree.yview); vsb.pack(side=tk.LEFT, fill=tk.Y)
         self.tree.configure(yscrollcommand=vsb.set)
@@ -946,10 +1565,14 @@ class LoanManager:
         self.refresh()
 
     def refresh(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for l in self.user.loans:
-            self.tree.insert('', tk.END, iid=l.id, values=(l.name, f'{l.amount:.2f}', l.loan_date or '', l.due_date or '', '是' if l.repaid else '否'))
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        rows = [(l.id, (l.name, l.amount_text, l.loan_date or '', l.due_date or '', '是' if l.repaid else '否'))
+                for l in self.user.loans]
+        insert = self.tree.insert
+        for iid, values in rows:
+            insert('', tk.END, iid=iid, values=values)
 
     def mark_repaid(self):
         sel = self.tree.selection()
@@ -981,18 +1604,19 @@ class StatsWindow:
         self.win.title('统计视图')
         self.frame = ttk.Frame(self.win); self.frame.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
         ttk.Label(self.frame, text='月份对比 (最近 6 个月)').pack(anchor='w')
-        self.tbl = ttk.Treeview(self.frame, columns=('month', 'income', 'expense'), show='headings')
-        for c, t in [('month', '月份'), ('income', '收入'), ('expense', '支出')]:
-            self.tbl.heading(c, text=t); self.tbl.column(c, width=100)
+        self.tbl = _make_table(self.frame, _STATS_COLS)
         self.tbl.pack(fill=tk.BOTH, expand=True)
         ttk.Button(self.frame, text='关闭', command=self.win.destroy).pack(pady=6)
         self.refresh()
 
     def refresh(self):
-        for i in self.tbl.get_children():
-            self.tbl.delete(i)
-        for m, inc, exp in self.stats.monthly_series(6):
-            self.tbl.insert('', tk.END, values=(m, f'{inc:.2f}', f'{exp:.2f}'))
+        children = self.tbl.get_children()
+        if children:
+            self.tbl.delete(*children)
+        rows = [(m, f'{inc:.2f}', f'{exp:.2f}') for m, inc, exp in self.stats.monthly_series(6)]
+        insert = self.tbl.insert
+        for values in rows:
+            insert('', tk.END, values=values)
 
     def show(self):
         self.win.transient(self.win.master)
@@ -49,3 +49,47 @@ def test_create_backup_auto_name():
         assert "backup_expense_" in backup_path
 
 
+
+
+def test_export_data_tracks_changes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = User(Storage(os.path.join(tmpdir, 'data.json')))
+        keep = user.add_record(10.0, 'expense', 'food', '2025-01-01T12:00:00')
+        gone = user.add_record(20.0, 'income', 'salary', '2025-01-02T12:00:00')
+        others = [user.add_record(float(i), 'expense', 'taxi', f'2025-01-0{i}T12:00:00') for i in range(3, 7)]
+        user.update_record(keep.id, amount=15.0, note='午饭')
+        user.delete_record(gone.id)
+        user.delete_record(others[1].id)
+        user.add_loan('张三', 50.0)
+
+        data = user.export_data()
+        assert len(data['records']) == 4
+        assert data['records'] == [r.to_dict() for r in user.records]
+        assert data['loans'] == [l.to_dict() for l in user.loans]
+
+
+def test_restore_large_backup_via_mmap(monkeypatch):
+    import expense_manager
+    monkeypatch.setattr(expense_manager, '_MMAP_READ_MIN', 0)  # take the memory-mapped path for any size
+    with tempfile.TemporaryDirectory() as tmpdir:
+        backup_path = os.path.join(tmpdir, 'backup.json')
+        user = User(Storage(os.path.join(tmpdir, 'data.json')))
+        for i in range(50):
+            user.add_record(1.0, 'expense', 'food', '2025-01-02T12:00:00')
+        user.create_backup(backup_path)
+
+        other = User(Storage(os.path.join(tmpdir, 'other.json')))
+        other.restore_from_backup(backup_path)
+        assert len(other.records) == 50
+
+
+def test_backup_is_compact_unless_pretty():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = User(Storage(os.path.join(tmpdir, 'data.json')))
+        user.add_record(1.0, 'expense', 'food', '2025-01-02T12:00:00')
+        compact = user.create_backup(os.path.join(tmpdir, 'compact.json'))
+        pretty = user.create_backup(os.path.join(tmpdir, 'pretty.json'), pretty=True)
+        with open(compact, 'rb') as f:
+            assert f.read().count(b'\n') == 0
+        with open(pretty, 'rb') as f:
+            assert f.read().count(b'\n') > 1
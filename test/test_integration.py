@@ -45,4 +45,40 @@ def test_integration_record_overconsumption():
         assert reminders[0][0] == 'over'
         assert '饮食' in reminders[0][1]
         
-        reminder_svc.stop()
\ No newline at end of file
+        reminder_svc.stop()
+
+def test_integration_threshold_reminder_on_change():
+    """集成测试：记录变更立即唤醒提醒线程 → 触发余额预警"""
+    import time
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = Storage(os.path.join(tmpdir, 'test.json'))
+        storage._data['settings']['initial_balance'] = 5000.0
+        user = User(storage)
+        reminders = []
+        reminder_svc = ReminderService(user, ui_callback=lambda kind, msg: reminders.append(kind))
+
+        user.add_record(2500.0, 'expense', '房租')
+        deadline = time.time() + 2.0
+        while not reminders and time.time() < deadline:
+            time.sleep(0.01)
+        assert reminders == ['warn']
+
+        reminder_svc.stop()
+
+def test_integration_settings_import_wakes_reminder():
+    """集成测试：导入只含设置的数据 → 余额降低后立即触发预警"""
+    import time
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = Storage(os.path.join(tmpdir, 'test.json'))
+        storage._data['settings']['initial_balance'] = 5000.0
+        user = User(storage)
+        reminders = []
+        reminder_svc = ReminderService(user, ui_callback=lambda kind, msg: reminders.append(kind))
+
+        user.import_data({'settings': {'initial_balance': 500.0}})
+        deadline = time.time() + 2.0
+        while not reminders and time.time() < deadline:
+            time.sleep(0.01)
+        assert reminders == ['urgent']
+
+        reminder_svc.stop()
@@ -0,0 +1,65 @@
+# test/test_statistics.py
+import os
+import tempfile
+from expense_manager import User, Storage, Statistics, now_iso
+
+
+def _make_user(tmpdir):
+    user = User(Storage(os.path.join(tmpdir, 'test.json')))
+    user.add_record(1000.0, 'income', 'salary', '2025-01-05T09:00:00')
+    user.add_record(200.0, 'expense', 'food', '2025-01-20T12:00:00')
+    user.add_record(50.0, 'expense', 'food', '2025-03-01T00:00:00')
+    user.add_record(80.0, 'expense', 'transport', '2024-12-31T23:59:59')
+    return user
+
+
+def test_yearly_summary():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stats = Statistics(_make_user(tmpdir))
+        summary = stats.yearly_summary(2025)
+        assert summary['total_income'] == 1000.0
+        assert summary['total_expense'] == 250.0
+        trend = {m['month']: (m['income'], m['expense']) for m in summary['monthly_trend']}
+        assert trend['2025-01'] == (1000.0, 200.0)
+        assert trend['2025-02'] == (0.0, 0.0)
+        assert trend['2025-03'] == (0.0, 50.0)
+        assert summary['category_breakdown']['food'] == 250.0
+        assert 'transport' not in summary['category_breakdown']
+
+
+def test_stats_follow_record_changes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = _make_user(tmpdir)
+        stats = Statistics(user)
+        assert stats.totals('2025-01-01T00:00:00', '2026-01-01T00:00:00')['expense'] == 250.0
+        assert stats.monthly_series(1)[0][1:] == (0.0, 0.0)
+
+        rec = user.add_record(30.0, 'expense', 'food', now_iso())
+        assert stats.monthly_series(1)[0][1:] == (0.0, 30.0)
+        user.update_record(rec.id, amount=45.0)
+        assert stats.monthly_series(1)[0][1:] == (0.0, 45.0)
+        assert stats.category_breakdown()['food'] == 295.0
+        user.delete_record(rec.id)
+        assert stats.monthly_series(1)[0][1:] == (0.0, 0.0)
+        assert stats.totals()['expense'] == 330.0
+
+
+def test_monthly_buckets_follow_moves_between_months():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = _make_user(tmpdir)
+        stats = Statistics(user)
+        rec = user.records[2]
+        user.update_record(rec.id, timestamp='2025-01-15T00:00:00', kind='income')
+        trend = {m['month']: (m['income'], m['expense']) for m in stats.yearly_summary(2025)['monthly_trend']}
+        assert trend['2025-01'] == (1050.0, 200.0)
+        assert trend['2025-03'] == (0.0, 0.0)
+        assert (2025 * 12 + 2) not in user._monthly
+
+
+def test_filter_records_by_range():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stats = Statistics(_make_user(tmpdir))
+        recs = stats.filter_records('2025-01-01T00:00:00', '2025-03-01T00:00:00')
+        assert [r.amount for r in recs] == [1000.0, 200.0]
+        assert len(stats.filter_records(start='2025-01-20T12:00:00')) == 2
+        assert len(stats.filter_records()) == 4
@@ -0,0 +1,183 @@
+# test/test_storage.py
+import os
+import tempfile
+import threading
+import pytest
+from expense_manager import User, Storage, Record
+
+
+def test_op_log_replayed_on_load():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        user = User(Storage(path))
+        keep = user.add_record(100.0, 'income', 'salary', '2025-01-01T12:00:00')
+        gone = user.add_record(30.0, 'expense', 'food', '2025-01-02T12:00:00')
+        user.update_record(keep.id, amount=120.0)
+        user.delete_record(gone.id)
+        user.set_initial_balance(50.0)
+        user.storage.flush()
+
+        # 单条变更只追加日志，不重写数据文件
+        assert not os.path.exists(path)
+        assert os.path.exists(user.storage.log_path)
+
+        reloaded = User(Storage(path))
+        assert [r.id for r in reloaded.records] == [keep.id]
+        assert reloaded.records[0].amount == 120.0
+        assert reloaded.get_balance() == 170.0
+
+
+def test_compact_merges_log_into_data_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        storage = Storage(path)
+        user = User(storage)
+        user.add_record(10.0, 'expense', 'food', '2025-01-02T12:00:00')
+        storage.close()
+
+        assert os.path.exists(path)
+        assert not os.path.exists(storage.log_path)
+        assert len(User(Storage(path)).records) == 1
+
+
+def test_background_compaction_every_n_ops():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        storage = Storage(path)
+        storage.COMPACT_EVERY = 3
+        user = User(storage)
+        for i in range(3):
+            user.add_record(1.0, 'expense', 'food', f'2025-01-0{i + 1}T12:00:00')
+        storage.flush()
+
+        assert os.path.exists(path)
+        assert not os.path.exists(storage.log_path)
+        assert len(User(Storage(path)).records) == 3
+
+
+def test_settings_and_overcats_changes_coalesce():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        storage = Storage(path)
+        storage.DIRTY_FLUSH_DELAY = 60  # only the explicit flush() below may drain the changes
+        user = User(storage)
+        for cat in ('food', 'games', 'taxi'):
+            user.add_overconsumption_category(cat)
+        user.remove_overconsumption_category('taxi')
+        user.set_thresholds(2000.0, 500.0)
+        storage.flush()
+
+        with open(storage.log_path, 'rb') as f:
+            assert len(f.readlines()) == 2
+        reloaded = User(Storage(path))
+        assert reloaded.overcats == {'food', 'games'}
+        assert reloaded.settings['threshold_warn'] == 2000.0
+
+
+def test_failed_save_leaves_no_temp_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        os.mkdir(path)  # os.replace onto a directory fails after the temp file is written
+        with open(os.path.join(path, 'keep'), 'w') as f:
+            f.write('x')
+        storage = Storage(path)
+        User(storage).add_record(10.0, 'expense', 'food', '2025-01-02T12:00:00')
+        storage.save(durable=True)
+
+        assert os.path.isdir(path)
+        assert not os.path.exists(path + '.tmp')
+
+
+def test_bulk_set_saves_once():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        storage = Storage(path)
+        saves = []
+        original_save = storage.save
+        storage.save = lambda durable=False: (saves.append(durable), original_save(durable))
+        rec = Record('r1', 5.0, 'expense', 'food', '2025-01-02T12:00:00')
+        storage.bulk_set(records=[rec], settings={'initial_balance': 20.0}, overcats=['food'])
+
+        assert len(saves) == 1
+        reloaded = User(Storage(path))
+        assert [r.id for r in reloaded.records] == ['r1']
+        assert reloaded.loans == []
+        assert reloaded.get_balance() == 15.0
+        assert reloaded.overcats == {'food'}
+
+
+def test_torn_log_tail_does_not_swallow_later_ops():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        user = User(Storage(path))
+        for day in (1, 2):
+            user.add_record(1.0, 'expense', 'food', f'2025-01-0{day}T12:00:00')
+        user.storage.flush()
+        # crash in the middle of appending the third op
+        with open(user.storage.log_path, 'ab') as f:
+            f.write(b'{"op": "add_record", "data": {"id": "torn"')
+
+        user = User(Storage(path))
+        for day in (3, 4):
+            user.add_record(1.0, 'expense', 'food', f'2025-01-0{day}T12:00:00')
+        user.storage.flush()  # crash again, without close()
+
+        assert len(User(Storage(path)).records) == 4
+
+
+def test_bad_log_line_in_the_middle_is_skipped():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        user = User(Storage(path))
+        first = user.add_record(1.0, 'expense', 'food', '2025-01-01T12:00:00')
+        user.storage.flush()
+        with open(user.storage.log_path, 'ab') as f:
+            f.write(b'not json\n')
+        second = user.add_record(2.0, 'expense', 'food', '2025-01-02T12:00:00')
+        user.storage.flush()
+
+        reloaded = User(Storage(path))
+        assert sorted(r.id for r in reloaded.records) == sorted([first.id, second.id])
+        assert not os.path.exists(reloaded.storage.log_path)
+
+
+def test_non_finite_amount_is_rejected_before_storage():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        user = User(Storage(path))
+        user.add_record(1.0, 'expense', 'food', '2025-01-01T12:00:00')
+        with pytest.raises(ValueError):
+            user.add_record(float('inf'), 'expense', 'food', '2025-01-02T12:00:00')
+        user.storage.flush()
+
+        reloaded = User(Storage(path))  # must still load
+        assert [r.amount for r in reloaded.records] == [1.0]
+
+
+def test_flush_returns_when_log_removal_fails(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'data.json')
+        storage = Storage(path)
+        storage.COMPACT_EVERY = 1
+        user = User(storage)
+        real_remove = os.remove
+        calls = []
+
+        def failing_remove(p):
+            calls.append(p)
+            if len(calls) == 1:
+                raise OSError('simulated failure')
+            real_remove(p)
+
+        monkeypatch.setattr(os, 'remove', failing_remove)
+        user.add_record(1.0, 'expense', 'food', '2025-01-01T12:00:00')
+        storage.flush()
+        user.add_record(2.0, 'expense', 'food', '2025-01-02T12:00:00')
+        # flush() would block forever if the writer thread had died
+        waiter = threading.Thread(target=storage.flush, daemon=True)
+        waiter.start()
+        waiter.join(5)
+        assert not waiter.is_alive()
+
+        monkeypatch.undo()
+        assert sorted(r.amount for r in User(Storage(path)).records) == [1.0, 2.0]
@@ -24,4 +24,59 @@ def test_get_balance_with_records():
         ]
         storage.save()
         user = User(storage)
-        assert user.get_balance() == 500 + 200 - 150  # 550.0
\ No newline at end of file
+        assert user.get_balance() == 500 + 200 - 150  # 550.0
+
+def test_balance_tracks_record_changes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = User(Storage(os.path.join(tmpdir, 'test.json')))
+        user.set_initial_balance(100.0)
+        inc = user.add_record(50.0, 'income', 'salary')
+        exp = user.add_record(20.0, 'expense', 'food')
+        assert user.get_balance() == 130.0
+        user.update_record(exp.id, kind='income')
+        assert user.get_balance() == 170.0
+        user.delete_record(inc.id)
+        assert user.get_balance() == 120.0
+
+
+def test_records_by_time_newest_first():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = User(Storage(os.path.join(tmpdir, 'test.json')))
+        a = user.add_record(1.0, 'expense', 'food', '2025-01-02T12:00:00')
+        b = user.add_record(2.0, 'expense', 'food', '2025-01-03T12:00:00')
+        c = user.add_record(3.0, 'expense', 'food', '2025-01-01T12:00:00')
+        assert [r.id for r in user.records_by_time()] == [b.id, a.id, c.id]
+        user.update_record(c.id, timestamp='2025-02-01T00:00:00')
+        user.delete_record(b.id)
+        assert [r.id for r in user.records_by_time()] == [c.id, a.id]
+
+
+def test_due_loans():
+    import datetime
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = User(Storage(os.path.join(tmpdir, 'test.json')))
+        late = user.add_loan('张三', 100.0, due_date='2025-01-10')
+        paid = user.add_loan('李四', 50.0, due_date='2025-01-05')
+        user.add_loan('王五', 20.0, due_date='2025-03-01')
+        user.add_loan('赵六', 10.0)
+        user.mark_loan_repaid(paid.id)
+        assert [l.id for l in user.due_loans(datetime.date(2025, 2, 1))] == [late.id]
+        user.delete_loan(late.id)
+        assert user.due_loans(datetime.date(2025, 2, 1)) == []
+
+def test_delete_keeps_record_order():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        user = User(Storage(os.path.join(tmpdir, 'test.json')))
+        recs = [user.add_record(float(i + 1), 'expense', 'food', f'2025-01-0{i + 1}T12:00:00') for i in range(4)]
+        assert user.delete_record(recs[0].id)
+        assert user.delete_record(recs[2].id)
+        assert not user.delete_record(recs[2].id)
+        assert [r.amount for r in user.records] == [2.0, 4.0]
+        assert user.update_record(recs[3].id, amount=30.0)
+        assert user.get_record(recs[3].id).amount == 30.0
+
+def test_record_from_dict_fast_matches_from_dict():
+    d = {'id': '1', 'amount': 12.5, 'kind': 'expense', 'category': 'food', 'timestamp': '2025-03-04T05:06:07'}
+    fast, slow = Record.from_dict_fast(d), Record.from_dict(d)
+    assert fast == slow
+    assert (fast.ts_epoch, fast.month_code, fast.amount_text) == (slow.ts_epoch, slow.month_code, slow.amount_text)